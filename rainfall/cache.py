@@ -0,0 +1,52 @@
+"""On-disk caches for Rainfall."""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+def content_hash(*parts: str) -> str:
+    """Hash the given strings into a stable cache key."""
+    return hashlib.blake2b("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """A directory of files keyed by content hash.
+    
+    The cache is best-effort: unreadable or unwritable entries behave like misses.
+    """
+    
+    def __init__(self, directory: Path, suffix: str = ""):
+        self.directory = directory
+        self.suffix = suffix
+    
+    def path_for(self, key: str) -> Path:
+        """Return the file path backing a key."""
+        return self.directory / f"{key}{self.suffix}"
+    
+    def get(self, key: str) -> bytes | None:
+        """Return the cached bytes for a key, or None on a miss."""
+        try:
+            return self.path_for(key).read_bytes()
+        except OSError:
+            return None
+    
+    def set(self, key: str, data: bytes) -> None:
+        """Store bytes under a key."""
+        path = self.path_for(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(data)
+            # Atomic rename so concurrent runs never see a partial entry
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+    
+    def delete(self, key: str) -> None:
+        """Remove a key's entry, if there is one."""
+        try:
+            self.path_for(key).unlink(missing_ok=True)
+        except OSError:
+            pass
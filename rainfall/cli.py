@@ -15,6 +15,10 @@ from rainfall.core import execute_with_rainfall
 @click.option("--verbose", "-v", is_flag=True, help="Show LLM prompts and responses")
 @click.option("--dry-run", is_flag=True, help="Show stub functions without executing")
 @click.option("--temperature", default=0.2, type=float, help="LLM temperature (0-1)")
+@click.option("--batch", is_flag=True, help="Generate code for all stubs up front, concurrently")
+@click.option("--no-cache", is_flag=True, help="Regenerate code, overwriting cached code")
+@click.option("--jit", is_flag=True, help="Compile generated code with Numba (requires numba)")
+@click.option("--memoize", is_flag=True, help="Cache stub results for repeated arguments")
 def main(
     script: Path,
     api_key: str | None,
@@ -22,6 +26,10 @@ def main(
     verbose: bool,
     dry_run: bool,
     temperature: float,
+    batch: bool,
+    no_cache: bool,
+    jit: bool,
+    memoize: bool,
 ):
     """
     Run a Python script with AI-powered stub functions.
@@ -39,6 +47,10 @@ def main(
         verbose=verbose,
         dry_run=dry_run,
         temperature=temperature,
+        batch=batch,
+        cache=not no_cache,
+        jit=jit,
+        memoize=memoize,
     )
     
     try:
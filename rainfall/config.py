@@ -1,7 +1,15 @@
 """Configuration for Rainfall."""
 
 from dataclasses import dataclass, field
+import importlib.util
 import os
+from pathlib import Path
+from typing import Callable
+
+
+def _default_cache_dir() -> Path:
+    base = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "rainfall"
 
 
 @dataclass
@@ -19,6 +27,17 @@ class RainfallConfig:
     # Behavior
     verbose: bool = False
     dry_run: bool = False
+    batch: bool = False  # Generate code for all stubs concurrently before running
+    jit: bool = False  # Compile generated code with Numba when it can be typed
+    memoize: bool = False  # Reuse results of repeated calls with the same arguments
+    
+    # Called with (stub name, text chunk) as generated code streams in. With batch,
+    # it's called from several worker threads at once, so it must be thread-safe
+    stream_callback: Callable[[str, str], None] | None = field(default=None, repr=False)
+    
+    # Caching
+    cache: bool = True  # Reuse cached code across runs; when off, entries are rewritten
+    cache_dir: Path = field(default_factory=_default_cache_dir)
     
     def __post_init__(self):
         # Fall back to environment variable if no API key provided
@@ -32,3 +51,7 @@ class RainfallConfig:
                 "No API key found. Set GEMINI_API_KEY environment variable "
                 "or pass --api-key to the command."
             )
+        if self.jit and importlib.util.find_spec("numba") is None:
+            raise ValueError(
+                "--jit requires Numba. Install it with: pip install 'rainfall-cli[jit]'"
+            )
@@ -1,41 +1,66 @@
 """Core execution logic for Rainfall."""
 
 import ast
+import importlib.util
+import marshal
 import sys
+from dataclasses import fields
 from pathlib import Path
+from types import CodeType
 from typing import Any
 
+from rainfall.cache import DiskCache, content_hash
 from rainfall.config import RainfallConfig
-from rainfall.parser import extract_stub_functions, StubFunction
+from rainfall.parser import BLOCK_FIELDS, extract_stubs, StubFunction
 from rainfall.llm import LLMProvider
 
 
+# Bump when the transform changes so stale cached bytecode is ignored
+_BYTECODE_CACHE_VERSION = "3"
+
+
 class StubTransformer(ast.NodeTransformer):
     """Transform stub function definitions to use our LLM-powered wrappers."""
     
-    def __init__(self, stub_names: set[str]):
-        self.stub_names = stub_names
+    def __init__(self, stubs: list[StubFunction]):
+        # Match on line too, so a same-named non-stub def is left alone
+        self.remaining = {(stub.name, stub.lineno) for stub in stubs}
+    
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        """Only descend into statement blocks; expressions can't define stubs."""
+        for field in BLOCK_FIELDS:
+            stmts = getattr(node, field, None)
+            if stmts:
+                kept = []
+                for stmt in stmts:
+                    # Once every stub is removed, the rest of the tree stays as is
+                    new = self.visit(stmt) if self.remaining else stmt
+                    if new is not None:
+                        kept.append(new)
+                # A block emptied of stubs still needs a statement
+                setattr(node, field, kept or [ast.Pass()])
+        return node
     
     def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
         """Remove stub function definitions (they'll be provided in namespace)."""
-        if node.name in self.stub_names:
+        key = (node.name, node.lineno)
+        if key in self.remaining:
+            self.remaining.remove(key)
             # Return None to remove this node from the AST
             return None
         return self.generic_visit(node)
     
     def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> ast.AST:
         """Handle async stub functions too."""
-        if node.name in self.stub_names:
-            return None
-        return self.generic_visit(node)
+        return self.visit_FunctionDef(node)
 
 
 def execute_with_rainfall(script_path: Path, config: RainfallConfig) -> None:
     """Execute a Python script with Rainfall-powered stub functions."""
     source_code = script_path.read_text(encoding="utf-8")
     
-    # Find all stub functions
-    stubs = extract_stub_functions(source_code)
+    # Find all stub functions and compile the script without them
+    stubs, code = _compile_script(script_path, source_code, config)
     
     if config.dry_run:
         _print_stubs(stubs)
@@ -47,15 +72,12 @@ def execute_with_rainfall(script_path: Path, config: RainfallConfig) -> None:
     # Create LLM provider
     llm = LLMProvider(config)
     
+    # Generate every stub up front instead of lazily on first call
+    if config.batch and stubs:
+        llm.generate_batch(stubs)
+    
     # Build stub lookup
     stub_lookup = {stub.name: stub for stub in stubs}
-    stub_names = set(stub_lookup.keys())
-    
-    # Transform AST to remove stub function definitions
-    tree = ast.parse(source_code)
-    transformer = StubTransformer(stub_names)
-    transformed_tree = transformer.visit(tree)
-    ast.fix_missing_locations(transformed_tree)
     
     # Create the execution namespace with our wrappers
     namespace = _create_namespace(stub_lookup, llm, config)
@@ -66,7 +88,49 @@ def execute_with_rainfall(script_path: Path, config: RainfallConfig) -> None:
         sys.path.insert(0, script_dir)
     
     # Execute the transformed script
-    exec(compile(transformed_tree, script_path, "exec"), namespace)
+    exec(code, namespace)
+
+
+def _compile_script(
+    script_path: Path,
+    source_code: str,
+    config: RainfallConfig,
+) -> tuple[list[StubFunction], CodeType]:
+    """Find stubs and compile the script without them, reusing cached bytecode."""
+    cache = DiskCache(config.cache_dir / "bytecode", ".pyc")
+    key = content_hash(
+        _BYTECODE_CACHE_VERSION,
+        importlib.util.MAGIC_NUMBER.hex(),
+        str(script_path),
+        source_code,
+    )
+    
+    if config.cache:
+        data = cache.get(key)
+        if data is not None:
+            try:
+                stub_fields, code = marshal.loads(data)
+                return [StubFunction(**fields) for fields in stub_fields], code
+            except (EOFError, ValueError, TypeError):
+                pass  # Corrupt entry; rebuild it
+    
+    # Parse once; the same tree is searched for stubs and then transformed
+    tree = ast.parse(source_code, filename=str(script_path))
+    stubs = extract_stubs(tree)
+    
+    # Transform AST to remove stub function definitions
+    transformer = StubTransformer(stubs)
+    transformed_tree = transformer.visit(tree)
+    ast.fix_missing_locations(transformed_tree)
+    code = compile(transformed_tree, script_path, "exec")
+    
+    stub_fields = [
+        {f.name: getattr(stub, f.name) for f in fields(stub) if f.init}
+        for stub in stubs
+    ]
+    cache.set(key, marshal.dumps((stub_fields, code)))
+    
+    return stubs, code
 
 
 def _print_stubs(stubs: list[StubFunction]) -> None:
@@ -80,17 +144,7 @@ def _print_stubs(stubs: list[StubFunction]) -> None:
     for stub in stubs:
         print(f"  Line {stub.lineno}: {stub.name}")
         
-        # Build signature display
-        sig_parts = []
-        for arg in stub.args:
-            if arg in stub.arg_types:
-                sig_parts.append(f"{arg}: {stub.arg_types[arg]}")
-            else:
-                sig_parts.append(arg)
-        sig = f"({', '.join(sig_parts)})"
-        if stub.return_type:
-            sig += f" -> {stub.return_type}"
-        print(f"    Signature: {stub.name}{sig}")
+        print(f"    Signature: {stub.signature}")
         
         if stub.docstring:
             # Show first line of docstring
@@ -113,7 +167,7 @@ def _create_namespace(
     
     # Create wrapper functions for each stub
     for name, stub in stub_lookup.items():
-        namespace[name] = _create_stub_wrapper(stub, llm, config)
+        namespace[name] = _create_stub_wrapper(stub, llm, config, namespace)
     
     return namespace
 
@@ -122,10 +176,11 @@ def _create_stub_wrapper(
     stub: StubFunction,
     llm: LLMProvider,
     config: RainfallConfig,
+    namespace: dict[str, Any],
 ):
     """Create a wrapper function that calls the LLM for a stub."""
     def wrapper(*args, **kwargs):
-        return llm.execute_stub(stub, args, kwargs)
+        return llm.execute_stub(stub, args, kwargs, namespace)
     
     # Preserve function metadata
     wrapper.__name__ = stub.name
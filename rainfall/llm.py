@@ -1,12 +1,18 @@
 """LLM provider that generates and executes code."""
 
-import json
+import ast
+import inspect
 import re
+import sys
 import traceback
-from typing import Any
+import types
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable
 
 import google.generativeai as genai
+from google.generativeai import client as genai_client
 
+from rainfall.cache import DiskCache, content_hash
 from rainfall.config import RainfallConfig
 from rainfall.parser import StubFunction
 
@@ -35,42 +41,165 @@ WRONG OUTPUT (has markdown):
 tip_rates = ...
 ```"""
 
+# Models shared by every provider with the same settings
+_MODEL_REGISTRY: dict[tuple, genai.GenerativeModel] = {}
+
+# Markdown cleanup for generated code
+_FENCE_RE = re.compile(r"```(?:python)?\s*\n?(.*?)```", re.DOTALL)
+_STRAY_FENCE_RE = re.compile(r"```(?:python)?")
+_LEADING_PYTHON_RE = re.compile(r"\Apython[ \t]*(?:\n|\Z)", re.IGNORECASE)
+
+# Annotations a stub needs on every parameter and its return to run in nopython mode.
+# Not int: Numba's integers are 64-bit and overflow silently where Python's don't
+_NOPYTHON_TYPES = {"float": float, "bool": bool}
+
 
 class LLMProvider:
     """LLM provider that generates and executes code."""
     
     def __init__(self, config: RainfallConfig):
         self.config = config
-        genai.configure(api_key=config.api_key)
-        self.model = genai.GenerativeModel(
-            model_name=config.model,
-            system_instruction=CODE_GEN_SYSTEM_PROMPT,
-            generation_config={
-                "temperature": config.temperature,
-                "max_output_tokens": 2048,
-            }
-        )
+        self.model = _get_model(config)
         self._code_cache: dict[str, str] = {}
+        self._functions: dict[str, Callable] = {}
+        self._base_namespace: dict | None = None
+        self._result_cache: dict[tuple, Any] = {}
+        self._prompts: dict[str, str] = {}
+        self._disk_cache = DiskCache(config.cache_dir / "code", ".py")
+        
+        # Optional Numba JIT for generated code
+        self._numba = None
+        self._fallbacks: dict[str, Callable] = {}  # stub name -> plain Python function
+        self._jit_modes: dict[str, str] = {}  # stub name -> "nopython" | "object" | "python"
+        self._jit_arg_types: dict[str, dict[str, type]] = {}  # nopython stubs: arg -> type
+        self._jit_errors: tuple[type[Exception], ...] = ()
+        if config.jit:
+            import numba
+            from numba.core import errors
+            self._numba = numba
+            # Unsupported opcodes raise an error outside the NumbaError hierarchy
+            self._jit_errors = (
+                errors.NumbaError,
+                getattr(errors, "UnsupportedBytecodeError", errors.NumbaError),
+            )
     
-    def execute_stub(self, stub: StubFunction, args: tuple, kwargs: dict) -> Any:
-        """Generate code for a stub and execute it."""
+    def execute_stub(
+        self,
+        stub: StubFunction,
+        args: tuple,
+        kwargs: dict,
+        script_globals: dict | None = None,
+    ) -> Any:
+        """Generate code for a stub and execute it.
+        
+        Default argument values are evaluated in script_globals, the namespace of
+        the script that declared the stub.
+        """
+        result_key = None
+        if self.config.memoize:
+            result_key = self._result_key(stub, args, kwargs)
+            try:
+                return self._result_cache[result_key]
+            except KeyError:
+                pass
+            except TypeError:
+                result_key = None  # Unhashable arguments can't be memoized
+        
         cache_key = stub.name
         
-        if cache_key not in self._code_cache:
-            code = self._generate_code_with_retry(stub)
-            self._code_cache[cache_key] = code
-            
-            if self.config.verbose:
-                print(f"\n[Rainfall] Generated code for {stub.name}:")
-                print("-" * 40)
-                print(code)
-                print("-" * 40)
-        else:
-            code = self._code_cache[cache_key]
+        if cache_key in self._functions:
+            func = self._functions[cache_key]
             if self.config.verbose:
                 print(f"\n[Rainfall] Using cached code for {stub.name}")
+        else:
+            code = self._code_cache.get(cache_key) or self._load_code(stub)
+            if code is None:
+                code = self._generate_code_with_retry(stub)
+                self._store_code(stub, code)
+            try:
+                func = self._compile_function(stub, code, script_globals)
+            except Exception:
+                self._evict_code(stub)
+                raise
+            self._functions[cache_key] = func
         
-        return self._execute_code(stub, code, args, kwargs)
+        result = self._execute_code(stub, func, args, kwargs)
+        if result_key is not None:
+            self._result_cache[result_key] = result
+        return result
+    
+    def _result_key(self, stub: StubFunction, args: tuple, kwargs: dict) -> tuple:
+        """Key a call by its arguments and their types, so f(1) and f(1.0) differ."""
+        items = tuple(sorted(kwargs.items()))
+        arg_types = tuple(type(value) for value in args) + tuple(type(value) for _, value in items)
+        return (stub.name, args, items, arg_types)
+    
+    def generate_batch(self, stubs: list[StubFunction]) -> None:
+        """Generate code for all stubs concurrently and cache it."""
+        pending = [
+            stub for stub in stubs
+            if stub.name not in self._code_cache and self._load_code(stub) is None
+        ]
+        if not pending:
+            return
+        
+        if self.config.verbose:
+            print(f"\n[Rainfall] Generating code for {len(pending)} stub(s) concurrently")
+        
+        # Generation is network-bound, so threads overlap the round-trips
+        with ThreadPoolExecutor(max_workers=min(8, len(pending))) as pool:
+            futures = {pool.submit(self._generate_code_with_retry, stub): stub for stub in pending}
+            for future in as_completed(futures):
+                stub = futures[future]
+                try:
+                    code = future.result()
+                except Exception as e:
+                    # Leave it uncached; the stub is generated again on first call
+                    if self.config.verbose:
+                        print(f"[Rainfall] Batch generation failed for {stub.name}: {e}")
+                    continue
+                self._store_code(stub, code)
+    
+    def _disk_key(self, stub: StubFunction) -> str:
+        """Key generated code by everything that determines it."""
+        return content_hash(
+            self.config.model,
+            str(self.config.temperature),
+            stub.to_prompt_context(),
+            CODE_GEN_SYSTEM_PROMPT,
+        )
+    
+    def _load_code(self, stub: StubFunction) -> str | None:
+        """Load previously generated code for a stub from disk."""
+        if not self.config.cache:
+            return None
+        
+        data = self._disk_cache.get(self._disk_key(stub))
+        if data is None:
+            return None
+        
+        code = data.decode("utf-8")
+        self._code_cache[stub.name] = code
+        if self.config.verbose:
+            print(f"\n[Rainfall] Loaded cached code for {stub.name} from disk")
+        return code
+    
+    def _store_code(self, stub: StubFunction, code: str) -> None:
+        """Cache generated code for a stub, in memory and on disk."""
+        self._code_cache[stub.name] = code
+        self._disk_cache.set(self._disk_key(stub), code.encode("utf-8"))
+        
+        if self.config.verbose:
+            print(f"\n[Rainfall] Generated code for {stub.name}:")
+            print("-" * 40)
+            print(code)
+            print("-" * 40)
+    
+    def _evict_code(self, stub: StubFunction) -> None:
+        """Drop a stub's code from the disk cache so the next run regenerates it."""
+        self._disk_cache.delete(self._disk_key(stub))
+        if self.config.verbose:
+            print(f"\n[Rainfall] Discarded cached code for {stub.name}")
     
     def _generate_code_with_retry(self, stub: StubFunction, max_retries: int = 2) -> str:
         """Generate code with retry on syntax errors."""
@@ -103,90 +232,269 @@ class LLMProvider:
         if self.config.verbose and not error_feedback:
             print(f"\n[Rainfall] Generating code for: {stub.name}")
         
-        response = self.model.generate_content(prompt)
-        raw = response.text.strip()
+        # Stream so callers can watch the code arrive instead of waiting for all of it
+        response = self.model.generate_content(prompt, stream=True)
+        chunks = []
+        for chunk in response:
+            # chunk.text raises on chunks without parts, which can end a stream
+            text = "".join(
+                part.text for candidate in chunk.candidates[:1] for part in candidate.content.parts
+            )
+            if not text:
+                continue
+            chunks.append(text)
+            if self.config.stream_callback is not None:
+                self.config.stream_callback(stub.name, text)
+        
+        # Nothing streamed: the aggregated response raises with the block/finish reason
+        raw = "".join(chunks).strip() if chunks else response.text.strip()
         
         return self._clean_code(raw)
     
     def _build_prompt(self, stub: StubFunction, error_feedback: str | None = None) -> str:
         """Build the generation prompt."""
-        sig_parts = []
-        for arg in stub.args:
-            if arg in stub.arg_types:
-                sig_parts.append(f"{arg}: {stub.arg_types[arg]}")
-            else:
-                sig_parts.append(arg)
+        prompt = self._prompts.get(stub.name)
+        if prompt is None:
+            prompt = self._prompts[stub.name] = self._build_stub_prompt(stub)
         
-        sig = f"{stub.name}({', '.join(sig_parts)})"
-        if stub.return_type:
-            sig += f" -> {stub.return_type}"
+        if error_feedback:
+            prompt += (
+                f"\n\nPREVIOUS CODE HAD ERROR: {error_feedback}"
+                "\nFix the error and regenerate."
+            )
         
-        parts = [f"Function: {sig}"]
+        return prompt
+    
+    def _build_stub_prompt(self, stub: StubFunction) -> str:
+        """Build the part of the prompt that is fixed for a stub."""
+        # Fixed instruction first, then the stub (retry feedback goes last), so
+        # requests share the longest possible prefix for Gemini's prompt caching
+        parts = [
+            "Write the function body (no markdown) for this function:",
+            f"\nFunction: {stub.signature}",
+        ]
         
         if stub.docstring:
             parts.append(f"Description: {stub.docstring}")
         
-        if error_feedback:
-            parts.append(f"\nPREVIOUS CODE HAD ERROR: {error_feedback}")
-            parts.append("Fix the error and regenerate.")
-        
-        parts.append("\nWrite the function body (no markdown):")
-        
         return "\n".join(parts)
     
     def _clean_code(self, raw: str) -> str:
         """Remove markdown and clean up generated code."""
-        code = raw
-        
-        # Remove ```python ... ``` blocks
-        pattern = r"```(?:python)?\s*\n?(.*?)```"
-        matches = re.findall(pattern, code, re.DOTALL)
-        if matches:
-            code = matches[0]
+        # Take the first ```python ... ``` block if there is one
+        match = _FENCE_RE.search(raw)
+        code = match.group(1) if match else raw
         
         # Remove stray ``` markers
-        code = code.replace("```python", "").replace("```", "")
+        code = _STRAY_FENCE_RE.sub("", code)
         
         # Remove leading "python" if LLM added it
-        lines = code.strip().split("\n")
-        if lines and lines[0].strip().lower() == "python":
-            lines = lines[1:]
+        code = _LEADING_PYTHON_RE.sub("", code.strip(), count=1)
         
-        return "\n".join(lines).strip()
+        return code.strip()
     
-    def _execute_code(self, stub: StubFunction, code: str, args: tuple, kwargs: dict) -> Any:
-        """Execute generated code."""
-        namespace = self._build_namespace()
+    def _compile_function(
+        self,
+        stub: StubFunction,
+        code: str,
+        script_globals: dict | None = None,
+    ) -> Callable:
+        """Compile generated code into a function with the stub's signature."""
+        module = ast.parse(f"def {stub.name}({stub.params}):\n    pass")
+        fn_def = module.body[0]
+        fn_def.body = ast.parse(code).body or [ast.Pass()]
         
-        # Inject arguments
-        for i, arg_name in enumerate(stub.args):
-            if i < len(args):
-                namespace[arg_name] = args[i]
-        namespace.update(kwargs)
+        # Annotations and defaults are expressions in the user's script, not in
+        # the generated namespace: drop the annotations, evaluate the defaults
+        # in the script's globals and bind them once the function exists
+        arguments = fn_def.args
+        for arg in (
+            *arguments.posonlyargs, *arguments.args, arguments.vararg,
+            *arguments.kwonlyargs, arguments.kwarg,
+        ):
+            if arg is not None:
+                arg.annotation = None
+        defaults = self._evaluate_defaults(stub, arguments, script_globals)
+        arguments.defaults = [ast.Constant(None) for _ in arguments.defaults]
+        arguments.kw_defaults = [
+            None if default is None else ast.Constant(None)
+            for default in arguments.kw_defaults
+        ]
+        ast.fix_missing_locations(module)
         
-        # Wrap in function to capture return
-        wrapped = f"""
-def __rainfall_fn__():
-{self._indent(code)}
-
-__result__ = __rainfall_fn__()
-"""
+        if self._numba is None:
+            namespace = self._build_namespace()
+            exec(compile(module, f"<rainfall:{stub.name}>", "exec"), namespace)
+            func = namespace[stub.name]
+            func.__defaults__, func.__kwdefaults__ = defaults
+            return func
+        
+        return self._jit_function(stub, module, defaults)
+    
+    def _evaluate_defaults(
+        self,
+        stub: StubFunction,
+        arguments: ast.arguments,
+        script_globals: dict | None,
+    ) -> tuple[tuple | None, dict | None]:
+        """Evaluate a stub's default values as (__defaults__, __kwdefaults__)."""
+        scope = script_globals if script_globals is not None else {"__builtins__": __builtins__}
+        
+        def evaluate(node: ast.expr) -> Any:
+            expression = ast.fix_missing_locations(ast.Expression(node))
+            try:
+                return eval(compile(expression, f"<rainfall:{stub.name}>", "eval"), scope)
+            except Exception as e:
+                raise RuntimeError(
+                    f"Could not evaluate default value {ast.unparse(node)!r} "
+                    f"for {stub.name}: {e}"
+                ) from e
+        
+        positional = tuple(evaluate(node) for node in arguments.defaults)
+        keyword = {
+            arg.arg: evaluate(node)
+            for arg, node in zip(arguments.kwonlyargs, arguments.kw_defaults)
+            if node is not None
+        }
+        return positional or None, keyword or None
+    
+    def _jit_function(
+        self,
+        stub: StubFunction,
+        module: ast.Module,
+        defaults: tuple[tuple | None, dict | None],
+    ) -> Callable:
+        """Compile a stub with Numba, keeping the plain function as a fallback."""
+        source = ast.unparse(module)
+        filename = f"<rainfall:{stub.name}>"
+        
+        # Numba's on-disk cache is keyed by a real source file
+        cache = False
+        if self.config.cache:
+            source_cache = DiskCache(self.config.cache_dir / "numba", ".py")
+            # Keyed by content so regenerated code never runs against a stale file
+            key = content_hash(source)
+            if source_cache.get(key) is None:
+                source_cache.set(key, source.encode("utf-8"))
+            path = source_cache.path_for(key)
+            if path.exists():
+                filename = str(path)
+                cache = True
+        
+        # Cached entries are reloaded against the module owning the globals,
+        # so give the generated code a real, importable module
+        module_name = f"_rainfall_{stub.name}"
+        generated = types.ModuleType(module_name)
+        generated.__dict__.update(self._build_namespace())
+        sys.modules[module_name] = generated
+        exec(compile(source, filename, "exec"), generated.__dict__)
+        func = generated.__dict__[stub.name]
+        func.__defaults__, func.__kwdefaults__ = defaults
+        
+        self._fallbacks[stub.name] = func
+        
+        # Numba can't bind keyword-only or variadic parameters
+        code = func.__code__
+        if code.co_kwonlyargcount or code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS):
+            self._jit_modes[stub.name] = "python"
+            return func
+        
+        # Nopython mode changes the behaviour of ordinary Python objects (dicts,
+        # strings, ...) without raising, so only numeric stubs are compiled
+        signature = self._numba_signature(stub)
+        if signature is None:
+            self._jit_modes[stub.name] = "python"
+            return func
+        
+        # Defaults are converted to the compiled types too, so they must already match
+        arg_types = {arg: _NOPYTHON_TYPES[stub.arg_types[arg]] for arg in stub.args}
+        defaults = zip(reversed(stub.args), reversed(func.__defaults__ or ()))
+        if any(type(value) is not arg_types[arg] for arg, value in defaults):
+            self._jit_modes[stub.name] = "python"
+            return func
+        
+        self._jit_modes[stub.name] = "nopython"
+        self._jit_arg_types[stub.name] = arg_types
+        jitted = self._numba.njit(cache=cache)(func)
+        try:
+            jitted.compile(signature)
+        except Exception:
+            # Nothing has run yet, so any failure here is Numba's
+            return self._downgrade_jit(stub)
+        
+        return jitted
+    
+    def _numba_signature(self, stub: StubFunction) -> tuple | None:
+        """Map numeric annotations to Numba types, or None if the stub isn't numeric."""
+        numba_types = {
+            "float": self._numba.float64,
+            "bool": self._numba.boolean,
+        }
+        if stub.return_type not in numba_types:
+            return None
+        
+        signature = []
+        for arg in stub.args:
+            numba_type = numba_types.get(stub.arg_types.get(arg))
+            if numba_type is None:
+                return None
+            signature.append(numba_type)
+        return tuple(signature)
+    
+    def _jit_accepts(self, stub: StubFunction, args: tuple, kwargs: dict) -> bool:
+        """Check Numba can take these arguments exactly as Python would see them."""
+        arg_types = self._jit_arg_types[stub.name]
+        if len(args) > len(stub.args):
+            return False
+        
+        for name, value in (*zip(stub.args, args), *kwargs.items()):
+            expected = arg_types.get(name)
+            if type(value) is not expected:
+                return False
+        return True
+    
+    def _downgrade_jit(self, stub: StubFunction) -> Callable:
+        """Step a stub down from nopython to object mode, then to plain Python."""
+        func = self._fallbacks[stub.name]
+        previous = self._jit_modes[stub.name]
+        if previous == "nopython":
+            # No loop lifting: lifted loops are typed like nopython code, ints included
+            mode = "object"
+            func = self._numba.jit(forceobj=True, looplift=False)(func)
+        else:
+            mode = "python"
+        
+        self._jit_modes[stub.name] = mode
+        self._functions[stub.name] = func
+        if self.config.verbose:
+            using = "plain Python" if mode == "python" else f"{mode} mode"
+            print(f"\n[Rainfall] Numba can't compile {stub.name} in {previous} mode, using {using}")
+        return func
+    
+    def _execute_code(self, stub: StubFunction, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """Execute generated code."""
+        if self._jit_modes.get(stub.name) == "nopython" and not self._jit_accepts(stub, args, kwargs):
+            # Numba would convert these arguments or fail to unbox them
+            func = self._fallbacks[stub.name]
         
         try:
-            exec(wrapped, namespace)
-            return namespace.get("__result__")
+            return func(*args, **kwargs)
         except Exception as e:
+            if isinstance(e, self._jit_errors) and self._jit_modes[stub.name] != "python":
+                return self._execute_code(stub, self._downgrade_jit(stub), args, kwargs)
             if self.config.verbose:
                 print(f"\n[Rainfall] Execution error in {stub.name}:")
                 traceback.print_exc()
+            self._evict_code(stub)
             raise RuntimeError(f"Execution failed for {stub.name}: {e}")
     
     def _build_namespace(self) -> dict:
         """Build execution namespace with common imports."""
-        namespace = {"__builtins__": __builtins__}
-        
-        # Standard library
-        imports = """
+        if self._base_namespace is None:
+            namespace = {"__builtins__": __builtins__}
+            
+            # Standard library
+            imports = """
 import os
 import sys
 import json
@@ -196,18 +504,42 @@ import datetime
 import html
 from pathlib import Path
 """
-        exec(imports, namespace)
-        
-        # Optional dependencies
-        for imp in ["import requests", "from PIL import Image", "import numpy as np"]:
-            try:
-                exec(imp, namespace)
-            except ImportError:
-                pass
+            exec(imports, namespace)
+            
+            # Optional dependencies
+            for imp in ["import requests", "from PIL import Image", "import numpy as np"]:
+                try:
+                    exec(imp, namespace)
+                except ImportError:
+                    pass
+            
+            self._base_namespace = namespace
         
-        return namespace
+        # Each stub gets its own globals; the module objects are shared
+        return self._base_namespace.copy()
     
     def _indent(self, code: str, spaces: int = 4) -> str:
         """Indent code block."""
         indent = " " * spaces
         return "\n".join(indent + line for line in code.split("\n"))
+
+
+def _get_model(config: RainfallConfig) -> genai.GenerativeModel:
+    """Return the shared model for these settings, creating it on first use."""
+    key = (config.api_key, config.model, config.temperature)
+    model = _MODEL_REGISTRY.get(key)
+    if model is None:
+        genai.configure(api_key=config.api_key)
+        model = genai.GenerativeModel(
+            model_name=config.model,
+            system_instruction=CODE_GEN_SYSTEM_PROMPT,
+            generation_config={
+                "temperature": config.temperature,
+                "max_output_tokens": 2048,
+            }
+        )
+        # The model would otherwise resolve the global client lazily, picking up
+        # whichever key was configured last; bind this key's client now
+        model._client = genai_client.get_default_generative_client()
+        _MODEL_REGISTRY[key] = model
+    return model
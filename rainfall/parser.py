@@ -1,75 +1,74 @@
 """AST parser to detect stub functions."""
 
 import ast
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StubFunction:
     """Represents a detected stub function."""
     name: str
-    args: list[str]
+    args: list[str]  # positional parameter names
     arg_types: dict[str, str]  # arg_name -> type annotation string
+    params: str  # full parameter list source, as written
     return_type: str | None
     docstring: str | None
     lineno: int
     
-    def to_prompt_context(self) -> str:
-        """Generate context string for LLM prompt."""
-        parts = [f"Function: {self.name}"]
-        
+    # Derived once in __post_init__
+    signature: str = field(init=False, repr=False, compare=False)
+    _prompt_context: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
         # Build signature
-        sig_parts = []
-        for arg in self.args:
-            if arg in self.arg_types:
-                sig_parts.append(f"{arg}: {self.arg_types[arg]}")
-            else:
-                sig_parts.append(arg)
-        
-        sig = f"{self.name}({', '.join(sig_parts)})"
+        sig = f"{self.name}({self.params})"
         if self.return_type:
             sig += f" -> {self.return_type}"
-        parts.append(f"Signature: {sig}")
         
+        parts = [f"Function: {self.name}", f"Signature: {sig}"]
         if self.docstring:
             parts.append(f"Description:\n{self.docstring}")
         
-        return "\n".join(parts)
+        # Frozen, so assign through object
+        object.__setattr__(self, "signature", sig)
+        object.__setattr__(self, "_prompt_context", "\n".join(parts))
+    
+    def to_prompt_context(self) -> str:
+        """Generate context string for LLM prompt."""
+        return self._prompt_context
 
 
 def is_stub_body(body: list[ast.stmt]) -> bool:
     """Check if a function body is a stub (only contains ... or pass)."""
-    if len(body) == 0:
-        return True
-    
-    # Check for just docstring + ellipsis/pass
-    real_stmts = []
+    # Single pass: skip docstrings, bail out on a second real statement
+    real = None
     for stmt in body:
-        # Skip docstrings
-        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
-            if isinstance(stmt.value.value, str):
+        value = getattr(stmt, "value", None)
+        if isinstance(stmt, ast.Expr) and isinstance(value, ast.Constant):
+            if isinstance(value.value, str):
                 continue  # This is a docstring
-        real_stmts.append(stmt)
+        if real is not None:
+            return False
+        real = stmt
     
-    if len(real_stmts) == 0:
+    if real is None:
         return True
     
-    if len(real_stmts) == 1:
-        stmt = real_stmts[0]
-        # Check for `...` (Ellipsis)
-        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
-            if stmt.value.value is ...:
-                return True
-        # Check for `pass`
-        if isinstance(stmt, ast.Pass):
-            return True
-        # Check for `raise NotImplementedError`
-        if isinstance(stmt, ast.Raise):
-            if isinstance(stmt.exc, ast.Call):
-                if isinstance(stmt.exc.func, ast.Name):
-                    if stmt.exc.func.id == "NotImplementedError":
-                        return True
+    # Check for `...` (Ellipsis)
+    if isinstance(real, ast.Expr):
+        return isinstance(real.value, ast.Constant) and real.value.value is ...
+    # Check for `pass`
+    if isinstance(real, ast.Pass):
+        return True
+    # Check for `raise NotImplementedError`
+    if isinstance(real, ast.Raise):
+        exc = real.exc
+        return (
+            isinstance(exc, ast.Call)
+            and isinstance(exc.func, ast.Name)
+            and exc.func.id == "NotImplementedError"
+        )
     
     return False
 
@@ -81,36 +80,63 @@ def get_type_annotation(node: ast.expr | None) -> str | None:
     return ast.unparse(node)
 
 
-def extract_stub_functions(source_code: str) -> list[StubFunction]:
-    """Parse source code and extract all stub functions."""
-    tree = ast.parse(source_code)
-    stubs = []
+# Statement lists that can hold function definitions
+BLOCK_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+
+class StubCollector(ast.NodeVisitor):
+    """Collect stub functions, visiting statements but never expressions."""
+    
+    def __init__(self):
+        self.stubs: list[StubFunction] = []
     
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-            if is_stub_body(node.body):
-                # Extract arguments
-                args = []
-                arg_types = {}
-                
-                for arg in node.args.args:
-                    args.append(arg.arg)
-                    if arg.annotation:
-                        arg_types[arg.arg] = get_type_annotation(arg.annotation)
-                
-                # Extract return type
-                return_type = get_type_annotation(node.returns)
-                
-                # Extract docstring
-                docstring = ast.get_docstring(node)
-                
-                stubs.append(StubFunction(
-                    name=node.name,
-                    args=args,
-                    arg_types=arg_types,
-                    return_type=return_type,
-                    docstring=docstring,
-                    lineno=node.lineno,
-                ))
+    def generic_visit(self, node: ast.AST) -> None:
+        """Recurse into nested statement blocks only."""
+        for field in BLOCK_FIELDS:
+            for child in getattr(node, field, ()):
+                self.visit(child)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        """Record stubs; look for nested definitions in everything else."""
+        if not is_stub_body(node.body):
+            self.generic_visit(node)
+            return
+        
+        # Extract arguments
+        args = []
+        arg_types = {}
+        
+        for arg in node.args.posonlyargs + node.args.args:
+            args.append(arg.arg)
+            if arg.annotation:
+                arg_types[arg.arg] = get_type_annotation(arg.annotation)
+        
+        # Extract return type
+        return_type = get_type_annotation(node.returns)
+        
+        # Extract docstring
+        docstring = ast.get_docstring(node)
+        
+        self.stubs.append(StubFunction(
+            name=node.name,
+            args=args,
+            arg_types=arg_types,
+            params=ast.unparse(node.args),
+            return_type=return_type,
+            docstring=docstring,
+            lineno=node.lineno,
+        ))
     
-    return stubs
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+
+def extract_stubs(tree: ast.AST) -> list[StubFunction]:
+    """Extract all stub functions from an already parsed tree."""
+    collector = StubCollector()
+    collector.visit(tree)
+    return collector.stubs
+
+
+def extract_stub_functions(source_code: str) -> list[StubFunction]:
+    """Parse source code and extract all stub functions."""
+    return extract_stubs(ast.parse(source_code))
@@ -0,0 +1,94 @@
+"""Shared fixtures: a fake Gemini model, so tests never reach the network."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from rainfall import llm
+from rainfall.config import RainfallConfig
+from rainfall.core import execute_with_rainfall
+from rainfall.llm import LLMProvider
+from rainfall.parser import extract_stub_functions
+
+
+class FakeChunk:
+    """A streamed chunk; like the SDK's, .text raises when it has no parts."""
+    
+    def __init__(self, text: str | None):
+        parts = [] if text is None else [SimpleNamespace(text=text)]
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=parts))]
+        self._text = text
+    
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("The response has no parts")
+        return self._text
+
+
+class FakeResponse(list):
+    """A streamed response: iterable chunks plus the aggregated .text."""
+    
+    @property
+    def text(self) -> str:
+        text = "".join(chunk._text for chunk in self if chunk._text)
+        if not text:
+            raise ValueError("The response was blocked")
+        return text
+
+
+class FakeModel:
+    """Answer each prompt with the code registered for the stub it asks about."""
+    
+    def __init__(self):
+        self.code: dict[str, str] = {}
+        self.calls: list[str] = []
+    
+    def generate_content(self, prompt: str, stream: bool = False) -> FakeResponse:
+        name = next(name for name in self.code if f"Function: {name}(" in prompt)
+        self.calls.append(name)
+        code = self.code[name]
+        if isinstance(code, Exception):
+            raise code
+        if code is None:
+            return FakeResponse([FakeChunk(None)])  # Nothing came back, e.g. blocked
+        
+        # Split the code across chunks and end on an empty one, as Gemini can
+        middle = len(code) // 2
+        return FakeResponse([FakeChunk(code[:middle]), FakeChunk(code[middle:]), FakeChunk(None)])
+
+
+@pytest.fixture
+def model(monkeypatch) -> FakeModel:
+    fake = FakeModel()
+    monkeypatch.setattr(llm, "_get_model", lambda config: fake)
+    return fake
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    def make(**kwargs) -> RainfallConfig:
+        kwargs.setdefault("cache_dir", tmp_path / "cache")
+        return RainfallConfig(api_key="test-key", **kwargs)
+    return make
+
+
+@pytest.fixture
+def run(tmp_path, make_config, capsys):
+    """Run a script through Rainfall and return what it printed."""
+    def run_script(source: str, **kwargs) -> str:
+        script = tmp_path / "script.py"
+        script.write_text(source, encoding="utf-8")
+        execute_with_rainfall(script, make_config(**kwargs))
+        return capsys.readouterr().out
+    return run_script
+
+
+@pytest.fixture
+def provider(model, make_config):
+    """Build a provider and the stubs of a source snippet."""
+    def build(source: str, **kwargs) -> tuple[LLMProvider, dict]:
+        stubs = {stub.name: stub for stub in extract_stub_functions(source)}
+        return LLMProvider(make_config(**kwargs)), stubs
+    return build
+
@@ -0,0 +1,194 @@
+"""End-to-end tests: scripts run through Rainfall against a fake model."""
+
+import ast
+
+import pytest
+
+from rainfall import core
+from rainfall.core import StubTransformer
+from rainfall.parser import extract_stubs
+
+
+def test_defaults_and_keyword_only_parameters(model, run):
+    model.code.update({
+        "greet": "return name + punct",
+        "join": "return sep.join(items)",
+        "summarize": "return ' '.join(text.split()[:max_words])",
+    })
+    out = run(
+        'SEP = ";"\n'
+        "\n"
+        "def greet(name, *, punct='!'):\n"
+        '    """Greet someone."""\n'
+        "    ...\n"
+        "\n"
+        "def join(items, sep=SEP):\n"
+        '    """Join items."""\n'
+        "    ...\n"
+        "\n"
+        "def summarize(text: str, max_words: int = 2) -> str:\n"
+        '    """Keep the first words."""\n'
+        "    ...\n"
+        "\n"
+        "print(greet('bob'), greet('amy', punct='?'))\n"
+        "print(join(['x', 'y']), join(['x', 'y'], sep='-'))\n"
+        "print(summarize('a b c'), summarize('a b c', max_words=1))\n"
+    )
+    assert out.splitlines() == ["bob! amy?", "x;y x-y", "a b a"]
+
+
+def test_positional_only_and_variadic_parameters(model, run):
+    model.code["total"] = "return (first + sum(rest)) * scale + len(extra)"
+    out = run(
+        "def total(first: 'Undefined', /, *rest: int, scale=2, **extra) -> int:\n"
+        '    """Sum everything."""\n'
+        "    ...\n"
+        "\n"
+        "print(total(1, 2, 3), total(1, 2, scale=3, z=1))\n"
+    )
+    assert out.split() == ["12", "10"]
+
+
+def test_unresolvable_default_is_a_clear_error(model, run):
+    model.code["f"] = "return x"
+    source = (
+        "def f(x=MISSING):\n"
+        '    """Return x."""\n'
+        "    ...\n"
+        "\n"
+        "f()\n"
+    )
+    with pytest.raises(RuntimeError, match="Could not evaluate default value 'MISSING' for f"):
+        run(source)
+
+
+def test_stubs_removed_from_nested_blocks(model, run):
+    model.code.update({
+        "double": "return x * 2",
+        "shout": "return s.upper()",
+        "inner": "return y + 1",
+        "handler": "return None",
+    })
+    out = run(
+        "def double(x: int) -> int:\n"
+        '    """Double x."""\n'
+        "    ...\n"
+        "\n"
+        "if True:\n"
+        "    def shout(s: str) -> str:\n"
+        '        """Uppercase s."""\n'
+        "        pass\n"
+        "\n"
+        "def outer():\n"
+        "    def inner(y):\n"
+        '        """Add one."""\n'
+        "        ...\n"
+        "    return inner(3)\n"
+        "\n"
+        "try:\n"
+        "    pass\n"
+        "except Exception:\n"
+        "    def handler(): ...\n"
+        "\n"
+        "class Other:\n"
+        "    def double(self):\n"
+        "        return 'method kept'\n"
+        "\n"
+        "print(double(5), shout('hi'), outer(), Other().double())\n"
+    )
+    assert out.split() == ["10", "HI", "4", "method", "kept"]
+
+
+def test_transform_keeps_same_named_defs_and_fills_emptied_blocks():
+    tree = ast.parse(
+        "if True:\n"
+        "    def f(): ...\n"
+        "def f():\n"
+        "    return 1\n"
+    )
+    stubs = extract_stubs(tree)
+    assert [(stub.name, stub.lineno) for stub in stubs] == [("f", 2)]
+    
+    transformed = StubTransformer(stubs).visit(tree)
+    assert ast.unparse(transformed) == "if True:\n    pass\n\ndef f():\n    return 1"
+
+
+def test_generated_code_is_cached_across_runs(model, run, tmp_path):
+    model.code["double"] = "return x * 2"
+    source = (
+        "def double(x):\n"
+        '    """Double x."""\n'
+        "    ...\n"
+        "\n"
+        "print(double(4))\n"
+    )
+    assert run(source) == "8\n"
+    assert run(source) == "8\n"
+    assert model.calls == ["double"]
+    
+    # --no-cache regenerates and overwrites the cached code
+    model.code["double"] = "return x * 3"
+    assert run(source, cache=False) == "12\n"
+    assert run(source) == "12\n"
+    assert model.calls == ["double", "double"]
+    assert len(list((tmp_path / "cache" / "code").glob("*.py"))) == 1
+
+
+def test_failing_code_is_evicted(model, run):
+    model.code["add_one"] = "return undefined_name + x"
+    source = (
+        "def add_one(x):\n"
+        '    """Add one to x."""\n'
+        "    ...\n"
+        "\n"
+        "print(add_one(1))\n"
+    )
+    with pytest.raises(RuntimeError, match="Execution failed for add_one"):
+        run(source)
+    
+    model.code["add_one"] = "return x + 1"
+    assert run(source) == "2\n"
+    assert model.calls == ["add_one", "add_one"]
+
+
+def test_script_bytecode_is_cached(model, run, monkeypatch):
+    model.code["double"] = "return x * 2"
+    source = (
+        "def double(x):\n"
+        '    """Double x."""\n'
+        "    ...\n"
+        "\n"
+        "print(double(4))\n"
+    )
+    assert run(source) == "8\n"
+    
+    # A cache hit never parses the script again
+    def fail(tree):
+        raise AssertionError("script was parsed again")
+    monkeypatch.setattr(core, "extract_stubs", fail)
+    assert run(source) == "8\n"
+
+
+def test_batch_keeps_results_when_one_stub_fails(model, run):
+    model.code.update({
+        "good": "return 'ok'",
+        "flaky": RuntimeError("quota exceeded"),
+    })
+    source = (
+        "def good():\n"
+        '    """Say ok."""\n'
+        "    ...\n"
+        "\n"
+        "def flaky():\n"
+        '    """Say fine."""\n'
+        "    ...\n"
+        "\n"
+        "print(good())\n"
+    )
+    assert run(source, batch=True) == "ok\n"
+    assert sorted(model.calls) == ["flaky", "good"]
+    
+    # The failed stub is left to lazy generation; the stored one is reused
+    model.code["flaky"] = "return 'fine'"
+    assert run(source + "print(flaky())\n", batch=True) == "ok\nfine\n"
+    assert sorted(model.calls) == ["flaky", "flaky", "good"]
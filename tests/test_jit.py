@@ -0,0 +1,77 @@
+"""Tests for --jit: which stubs Numba compiles, and that results match plain Python."""
+
+import pytest
+
+pytest.importorskip("numba")
+
+
+FACT = "r = 1\nfor i in range(2, n + 1):\n    r *= i\nreturn r"
+
+
+def test_only_numeric_stubs_run_in_nopython_mode(model, provider):
+    model.code.update({
+        "fmt": "d = {'a': x}\nreturn f'{d}'",
+        "hypot": "return math.sqrt(a * a + b * b)",
+    })
+    llm, stubs = provider(
+        "def fmt(x):\n    ...\n"
+        "def hypot(a: float, b: float) -> float:\n    ...\n",
+        jit=True,
+    )
+    
+    assert llm.execute_stub(stubs["fmt"], (3,), {}) == "{'a': 3}"
+    assert llm.execute_stub(stubs["hypot"], (3.0, 4.0), {}) == 5.0
+    assert llm._jit_modes == {"fmt": "python", "hypot": "nopython"}
+
+
+def test_int_stubs_keep_python_integers(model, provider):
+    model.code.update({"fact": FACT, "add": "return a + b"})
+    llm, stubs = provider(
+        "def fact(n: int) -> int:\n    ...\n"
+        "def add(a: int, b: int) -> int:\n    ...\n",
+        jit=True,
+    )
+    
+    assert llm.execute_stub(stubs["fact"], (25,), {}) == 15511210043330985984000000
+    assert llm.execute_stub(stubs["add"], (2**70, 1), {}) == 2**70 + 1
+    assert llm._jit_modes == {"fact": "python", "add": "python"}
+
+
+def test_mismatched_arguments_run_as_plain_python(model, provider):
+    model.code["scale"] = "return x * k"
+    llm, stubs = provider("def scale(x: float, k: float = 2.0) -> float:\n    ...\n", jit=True)
+    scale = stubs["scale"]
+    
+    assert llm.execute_stub(scale, (1.5,), {}) == 3.0
+    assert llm.execute_stub(scale, (1.5,), {"k": 3.0}) == 4.5
+    # Numba would turn these into floats; Python keeps them as they are
+    assert llm.execute_stub(scale, (2**70, 2), {}) == 2**71
+    assert llm.execute_stub(scale, ("ab", 2), {}) == "abab"
+    assert llm._jit_modes["scale"] == "nopython"
+
+
+def test_uncompilable_stub_falls_back_to_object_mode(model, provider):
+    model.code["label"] = "return json.dumps({'flag': flag}) == '{\"flag\": true}'"
+    llm, stubs = provider("def label(flag: bool) -> bool:\n    ...\n", jit=True)
+    
+    assert llm.execute_stub(stubs["label"], (True,), {}) is True
+    assert llm._jit_modes["label"] == "object"
+
+
+def test_numba_source_file_follows_the_code(model, provider, make_config):
+    source = "def half(x: float) -> float:\n    ...\n"
+    model.code["half"] = "return x / 2"
+    llm, stubs = provider(source, jit=True)
+    assert llm.execute_stub(stubs["half"], (3.0,), {}) == 1.5
+    
+    # Code regenerated after its cache entry is cleared gets its own source file
+    for path in (make_config().cache_dir / "code").glob("*.py"):
+        path.unlink()
+    model.code["half"] = "return x / 4"
+    llm, stubs = provider(source, jit=True)
+    assert llm.execute_stub(stubs["half"], (3.0,), {}) == 0.75
+    func = llm._fallbacks["half"]
+    assert "x / 4" in open(func.__code__.co_filename).read()
+    
+    numba_dir = make_config().cache_dir / "numba"
+    assert len(list(numba_dir.glob("*.py"))) == 2
@@ -0,0 +1,44 @@
+"""Tests for code generation, streaming and memoization in LLMProvider."""
+
+import pytest
+
+
+def test_streamed_chunks_reach_the_callback(model, provider):
+    model.code["double"] = "return x * 2"
+    chunks = []
+    llm, stubs = provider(
+        "def double(x):\n    ...\n",
+        stream_callback=lambda name, chunk: chunks.append((name, chunk)),
+    )
+    
+    assert llm.execute_stub(stubs["double"], (3,), {}) == 6
+    # The empty final chunk is skipped rather than raising
+    assert chunks == [("double", "return"), ("double", " x * 2")]
+
+
+def test_empty_stream_surfaces_the_response_error(model, provider):
+    model.code["double"] = None
+    llm, stubs = provider("def double(x):\n    ...\n")
+    
+    with pytest.raises(ValueError, match="blocked"):
+        llm.execute_stub(stubs["double"], (3,), {})
+
+
+def test_generated_code_is_cleaned(model, provider):
+    model.code["double"] = "```python\nreturn x * 2\n```"
+    llm, stubs = provider("def double(x):\n    ...\n")
+    
+    assert llm.execute_stub(stubs["double"], (3,), {}) == 6
+
+
+def test_memoize_keys_on_argument_types(model, provider):
+    model.code["echo"] = "calls.append(x)\nreturn x"
+    llm, stubs = provider("def echo(x):\n    ...\n", memoize=True)
+    calls = []
+    llm._base_namespace = {"__builtins__": __builtins__, "calls": calls}
+    
+    assert llm.execute_stub(stubs["echo"], (1,), {}) == 1
+    assert llm.execute_stub(stubs["echo"], (1,), {}) == 1
+    assert type(llm.execute_stub(stubs["echo"], (1.0,), {})) is float
+    assert llm.execute_stub(stubs["echo"], ([1],), {}) == [1]
+    assert calls == [1, 1.0, [1]]